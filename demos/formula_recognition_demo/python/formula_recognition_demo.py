@@ -21,6 +21,7 @@ import sys
 from argparse import SUPPRESS, ArgumentParser
 
 import cv2 as cv
+import numpy as np
 from tqdm import tqdm
 from utils import (COLOR_BLACK, COLOR_RED, COLOR_WHITE, DEFAULT_RESIZE_STEP,
                    DEFAULT_WIDTH, MAX_HEIGHT, MAX_WIDTH, MIN_HEIGHT, MIN_WIDTH,
@@ -38,6 +39,8 @@ class InteractiveDemo:
         self._prev_rendered_formula = None
         self._prev_formula_img = None
         self._latex_h = 0
+        self._text_overlay_key = None
+        self._text_overlay = None
         self._renderer = create_renderer()
 
     def _create_input_window(self):
@@ -80,23 +83,49 @@ class InteractiveDemo:
     def _put_text(self, frame, text):
         if text == '':
             return frame
-        text = strip_internal_spaces(text)
-        (txt_w, self._latex_h), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 1, 3)
-        start_point = (self.start_point[0],
-                       self.end_point[1] - self.start_point[1] + int(self._latex_h * 1.5))
-        frame = cv.putText(frame, text, org=start_point, fontFace=cv.FONT_HERSHEY_SIMPLEX,
-                           fontScale=0.7, color=COLOR_BLACK, thickness=3, lineType=cv.LINE_AA)
-        frame = cv.putText(frame, text, org=start_point, fontFace=cv.FONT_HERSHEY_SIMPLEX,
-                           fontScale=0.7, color=COLOR_WHITE, thickness=2, lineType=cv.LINE_AA)
-        comment_coords = (0, self.end_point[1] - self.start_point[1] + int(self._latex_h * 1.5))
-        frame = cv.putText(frame, "Predicted:", comment_coords,
-                           fontFace=cv.FONT_HERSHEY_SIMPLEX, fontScale=0.7, color=COLOR_WHITE, thickness=2, lineType=cv.LINE_AA)
+        overlay_key = (text, self.start_point, self.end_point, frame.shape)
+        if overlay_key != self._text_overlay_key:
+            self._text_overlay = self._render_text(frame.shape, text)
+            self._text_overlay_key = overlay_key
+        y_start, overlay, transparency = self._text_overlay
+        roi = frame[y_start:y_start + overlay.shape[0]]
+        rows = roi.shape[0]
+        roi[...] = np.clip(roi * transparency[:rows] + overlay[:rows], 0, 255)
         return frame
 
+    def _render_text(self, frame_shape, text):
+        """
+        Renders the predicted text into a horizontal band of the frame
+        which is reused while the prediction stays the same.
+        Returns the band position, its colors premultiplied by opacity and its transparency
+        """
+        text = strip_internal_spaces(text)
+        (_, self._latex_h), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 1, 3)
+        text_y = self.end_point[1] - self.start_point[1] + int(self._latex_h * 1.5)
+        # the band covers the drawn text with its outline, which extends beyond the text size by the stroke
+        thickness = 3
+        (_, text_h), baseline = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.7, thickness)
+        y_start = max(text_y - text_h - thickness, 0)
+        overlay = np.zeros((text_y + baseline + thickness - y_start, frame_shape[1], 3), dtype=np.uint8)
+        mask = np.zeros(overlay.shape[:2], dtype=np.uint8)
+        start_point = (self.start_point[0], text_y - y_start)
+        comment_coords = (0, text_y - y_start)
+        for canvas, black, white in ((overlay, COLOR_BLACK, COLOR_WHITE), (mask, 255, 255)):
+            cv.putText(canvas, text, org=start_point, fontFace=cv.FONT_HERSHEY_SIMPLEX,
+                       fontScale=0.7, color=black, thickness=thickness, lineType=cv.LINE_AA)
+            cv.putText(canvas, text, org=start_point, fontFace=cv.FONT_HERSHEY_SIMPLEX,
+                       fontScale=0.7, color=white, thickness=2, lineType=cv.LINE_AA)
+            cv.putText(canvas, "Predicted:", comment_coords,
+                       fontFace=cv.FONT_HERSHEY_SIMPLEX, fontScale=0.7, color=white, thickness=2, lineType=cv.LINE_AA)
+        # text is drawn on black, so the overlay colors are already premultiplied by the antialiased mask
+        transparency = 1 - mask[..., np.newaxis] / np.float32(255)
+        return y_start, overlay.astype(np.float32), transparency
+
     def put_crop(self, frame, crop):
         height = self.end_point[1] - self.start_point[1]
         width = self.end_point[0] - self.start_point[0]
-        crop = cv.resize(crop, (width, height))
+        if crop.shape[:2] != (height, width):
+            crop = cv.resize(crop, (width, height))
         frame[0:height, self.start_point[0]:self.end_point[0], :] = crop
         comment_coords = (0, 20)
         frame = cv.putText(frame, "Model input:", comment_coords, fontFace=cv.FONT_HERSHEY_SIMPLEX,
@@ -152,6 +181,9 @@ def create_capture(input_source, demo_resolution):
         pass
     capture = cv.VideoCapture(input_source)
     capture.set(cv.CAP_PROP_BUFFERSIZE, 1)
+    if isinstance(input_source, int):
+        # compressed stream lets USB cameras deliver higher frame rates than raw YUYV
+        capture.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*'MJPG'))
     capture.set(cv.CAP_PROP_FRAME_WIDTH, demo_resolution[0])
     capture.set(cv.CAP_PROP_FRAME_HEIGHT, demo_resolution[1])
     return capture
@@ -160,9 +192,9 @@ def create_capture(input_source, demo_resolution):
 def non_interactive_demo(model, args):
     renderer = create_renderer()
     show_window = not args.no_show
-    for rec in tqdm(model.images_list):
-        image = rec.img
-        distribution, targets = model.infer_sync(image)
+    images = [rec.img for rec in model.images_list]
+    results = model.infer_sync(images)
+    for rec, (distribution, targets) in zip(tqdm(model.images_list), results):
         prob = calculate_probability(distribution)
         log.info("Confidence score is {}".format(prob))
         if prob >= args.conf_thresh ** len(distribution):
@@ -259,6 +291,7 @@ def main():
     prev_text = ''
     demo = InteractiveDemo((height, width), resolution=args.resolution)
     show_window = not args.no_show
+    model_input = np.empty((height, width, 3), dtype=np.uint8)
     capture = create_capture(args.input, demo.resolution)
     if not capture.isOpened():
         log.error("Cannot open camera")
@@ -268,7 +301,7 @@ def main():
         if not ret:
             break
         bin_crop = demo.get_crop(frame)
-        model_input = prerocess_crop(bin_crop, (height, width), preprocess_type=args.preprocessing_type)
+        prerocess_crop(bin_crop, (height, width), preprocess_type=args.preprocessing_type, out=model_input)
         frame = demo.put_crop(frame, model_input)
         model_res = model.infer_async(model_input)
         if not model_res:
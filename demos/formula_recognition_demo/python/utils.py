@@ -14,21 +14,23 @@
  limitations under the License.
 """
 
-import copy
 import json
 import logging as log
 import os
 import re
-import subprocess # nosec - disable B404:import-subprocess check
+import shutil
 import tempfile
+from collections import deque
 from enum import Enum
+from functools import partial
 from multiprocessing.pool import ThreadPool
+from threading import Condition
 from types import SimpleNamespace as namespace
 
 import cv2 as cv
 import numpy as np
 import sympy
-from openvino.runtime import Core, get_version
+from openvino.runtime import AsyncInferQueue, Core, PartialShape, Tensor, get_version
 from tqdm import tqdm
 
 START_TOKEN = 0
@@ -44,6 +46,8 @@ COLOR_BLACK = (0, 0, 0)
 COLOR_RED = (0, 0, 255)
 # default value to resize input window's width in pixels
 DEFAULT_RESIZE_STEP = 10
+# maximum number of images encoded in one inference in the non-interactive mode
+MAX_ENCODER_BATCH_SIZE = 8
 
 
 def strip_internal_spaces(text):
@@ -86,9 +90,7 @@ def create_renderer():
     Checks if pdflatex is installed and rendering
     of latex formula could be performed
     """
-    command = subprocess.run(["pdflatex", "--version"], stdout=subprocess.DEVNULL,
-                             stderr=subprocess.DEVNULL, check=False, shell=True) # shell=True is used to process case with no pdflatex installed on Windows
-    if command.returncode != 0:
+    if shutil.which("pdflatex") is None:
         renderer = None
         log.warning("pdflatex not installed, please, install it to use rendering")
     else:
@@ -96,28 +98,46 @@ def create_renderer():
     return renderer
 
 
-def preprocess_image(preprocess, image_raw, tgt_shape):
+def read_image(path, tgt_shape, preprocess_type='crop'):
+    """
+    Reads the image. JPEG images which are downscaled at least
+    twice by the resize preprocessing are decoded at half resolution
+    """
+    if preprocess_type == 'resize' and path.lower().endswith(('.jpg', '.jpeg')):
+        image = cv.imread(path, cv.IMREAD_REDUCED_COLOR_2)
+        if image is not None:
+            target_height, target_width = tgt_shape
+            img_h, img_w = image.shape[0:2]
+            if min(target_height / img_h, target_width / img_w) <= 1:
+                return image
+    return cv.imread(path)
+
+
+def preprocess_image(preprocess, image_raw, tgt_shape, out=None):
     """
     Crop or resize with constant aspect ratio
-    and bottom right pad resulting image
+    and bottom right pad resulting image.
+    If out is given, the result is written to it
     """
     target_height, target_width = tgt_shape
     image_raw = preprocess(image_raw, tgt_shape)
     img_h, img_w = image_raw.shape[0:2]
-    image_raw = cv.copyMakeBorder(image_raw, 0, target_height - img_h,
-                                  0, target_width - img_w, cv.BORDER_CONSTANT,
-                                  None, COLOR_WHITE)
-    return image_raw
+    if out is None:
+        out = np.empty((target_height, target_width, image_raw.shape[2]), dtype=image_raw.dtype)
+    out[:img_h, :img_w] = image_raw
+    out[:img_h, img_w:] = COLOR_WHITE
+    out[img_h:] = COLOR_WHITE
+    return out
 
 
-def prerocess_crop(crop, tgt_shape, preprocess_type='crop'):
+def prerocess_crop(crop, tgt_shape, preprocess_type='crop', out=None):
     """
     Binarize image and call preprocess_image function
     """
     crop = cv.cvtColor(crop, cv.COLOR_BGR2GRAY)
-    crop = cv.cvtColor(crop, cv.COLOR_GRAY2BGR)
-    _, bin_crop = cv.threshold(crop, 120, 255, type=cv.THRESH_BINARY)
-    return preprocess_image(PREPROCESSING[preprocess_type], bin_crop, tgt_shape)
+    _, bin_crop = cv.threshold(crop, 0, 255, type=cv.THRESH_BINARY | cv.THRESH_OTSU)
+    bin_crop = cv.cvtColor(bin_crop, cv.COLOR_GRAY2BGR)
+    return preprocess_image(PREPROCESSING[preprocess_type], bin_crop, tgt_shape, out)
 
 
 def read_net(model_path, core, model_type):
@@ -130,20 +150,17 @@ def change_layout(model_input):
     Change layout of the image from [H, W, C] to [N, C, H, W]
     where N is equal to one (batch dimension)
     """
-    model_input = model_input.transpose((2, 0, 1))
-    model_input = np.expand_dims(model_input, axis=0)
-    return model_input
+    return cv.dnn.blobFromImage(model_input)
 
 
 def calculate_probability(distribution):
-    return np.prod(np.amax(distribution, axis=1))
+    return float(np.prod(np.amax(distribution, axis=1)))
 
 
 class Model:
     class Status(Enum):
         READY = 0
-        ENCODER_INFER = 1
-        DECODER_INFER = 2
+        DECODER_INFER = 1
 
     def __init__(self, args, interactive_mode):
         self.args = args
@@ -152,128 +169,235 @@ class Model:
         self.core = Core()
         self.encoder = read_net(self.args.m_encoder, self.core, 'Formula Recognition Encoder')
         self.decoder = read_net(self.args.m_decoder, self.core, 'Formula Recognition Decoder')
-        self.compiled_encoder = self.core.compile_model(self.encoder, device_name=self.args.device)
+        self.images_list = []
+        self.check_model_dimensions()
+        self.encoder_batch_size = 1
+        if not interactive_mode:
+            self.preprocess_inputs()
+            self.encoder_batch_size = self._reshape_encoder(min(len(self.images_list), MAX_ENCODER_BATCH_SIZE))
+        # images are independent in the batch mode, so the encoder is tuned for throughput there;
+        # the decoder is autoregressive and always benefits from the lowest latency
+        encoder_hint = 'LATENCY' if interactive_mode else 'THROUGHPUT'
+        self.compiled_encoder = self.core.compile_model(self.encoder, device_name=self.args.device,
+                                                        config={'PERFORMANCE_HINT': encoder_hint})
         log.info('The Formula Recognition Encoder model {} is loaded to {}'.format(args.m_encoder, args.device))
-        self.compiled_decoder = self.core.compile_model(self.decoder, device_name=self.args.device)
+        self.compiled_decoder = self.core.compile_model(self.decoder, device_name=self.args.device,
+                                                        config={'PERFORMANCE_HINT': 'LATENCY'})
         log.info('The Formula Recognition Decoder model {} is loaded to {}'.format(args.m_decoder, args.device))
-        self.images_list = []
         self.vocab = Vocab(self.args.vocab_path)
         self.model_status = Model.Status.READY
         self.is_async = interactive_mode
-        self.infer_request_encoder = self.compiled_encoder.create_infer_request()
         self.infer_request_decoder = self.compiled_decoder.create_infer_request()
         self.num_infers_decoder = 0
-        self.check_model_dimensions()
-        if not interactive_mode:
-            self.preprocess_inputs()
+        # decoding results are written in place to avoid allocations on every decoder step
+        vocab_size = self.decoder.output(self.args.logit_layer).shape[1]
+        self.logits = np.empty((self.args.max_formula_len, vocab_size), dtype=np.float32)
+        # a formula is accepted if its probability is at least conf_thresh ** len(formula),
+        # so once the probability is below this bound no continuation can be accepted
+        self.min_prob = self.args.conf_thresh ** self.args.max_formula_len
+        self.prob = 1.0
+        # layer names are resolved once and decoder inputs are written in place on every step
+        self.encoder_to_decoder = ((self.args.row_enc_out_layer, self.args.row_enc_out_layer),
+                                   (self.args.hidden_layer, self.args.dec_st_h_layer),
+                                   (self.args.context_layer, self.args.dec_st_c_layer),
+                                   (self.args.init_0_layer, self.args.output_prev_layer))
+        self.decoder_states = ((self.args.dec_st_h_t_layer, self.args.dec_st_h_layer),
+                               (self.args.dec_st_c_t_layer, self.args.dec_st_c_layer),
+                               (self.args.output_layer, self.args.output_prev_layer))
+        self.logit_layer = self.args.logit_layer
+        self.decoder_inputs = self._bind_decoder_inputs()
+        self.tgt = self.decoder_inputs[self.args.tgt_layer]
+        num_requests = self.compiled_encoder.get_property('OPTIMAL_NUMBER_OF_INFER_REQUESTS')
+        self.encoder_queue = AsyncInferQueue(self.compiled_encoder, num_requests)
+        # exceptions raised in callbacks are lost, so they are kept to be raised by the consumer of the results
+        self.callback_exceptions = []
+        if interactive_mode:
+            self.encoder_queue.set_callback(self._on_frame_encoded)
+            # only the freshest encoded frame is worth decoding
+            self.encoder_results = deque(maxlen=1)
+        else:
+            self.encoder_queue.set_callback(self._on_batch_encoded)
+            self.encoder_results = {}
+            self.image_encoded = Condition()
 
     def preprocess_inputs(self):
         _, _, height, width = self.encoder.input("imgs").shape
         target_shape = (height, width)
         if os.path.isdir(self.args.input):
-            inputs = sorted(os.path.join(self.args.input, inp)
-                            for inp in os.listdir(self.args.input))
+            with os.scandir(self.args.input) as entries:
+                inputs = sorted(entry.path for entry in entries if entry.is_file())
         else:
             inputs = [self.args.input]
-        for filenm in tqdm(inputs):
-            image_raw = cv.imread(filenm)
-            assert image_raw is not None, "Error reading image {}".format(filenm)
-            image = preprocess_image(
-                PREPROCESSING[self.args.preprocessing_type], image_raw, target_shape)
-            record = namespace(img_name=filenm, img=image)
-            self.images_list.append(record)
+        # images are read in background threads to overlap disk I/O with preprocessing
+        with ThreadPool() as reader:
+            images_raw = reader.imap(partial(read_image, tgt_shape=target_shape,
+                                             preprocess_type=self.args.preprocessing_type), inputs)
+            for filenm, image_raw in zip(inputs, tqdm(images_raw, total=len(inputs))):
+                assert image_raw is not None, "Error reading image {}".format(filenm)
+                image = preprocess_image(
+                    PREPROCESSING[self.args.preprocessing_type], image_raw, target_shape)
+                record = namespace(img_name=filenm, img=image)
+                self.images_list.append(record)
 
     def check_model_dimensions(self):
         batch_dim, channels, height, width = self.encoder.input("imgs").shape
         assert batch_dim == 1, "Demo only works with batch size 1."
         assert channels in (1, 3), "Input image is not 1 or 3 channeled image."
 
-    def _async_infer_encoder(self, image):
-        self.infer_request_encoder.start_async(inputs={self.args.imgs_layer: image})
+    def _reshape_encoder(self, batch_size):
+        """
+        Reshapes the encoder to encode several images in one inference.
+        Returns the resulting batch size, which is 1 if the encoder can't be reshaped
+        """
+        if batch_size <= 1:
+            return 1
+        _, channels, height, width = self.encoder.input(self.args.imgs_layer).shape
+        try:
+            self.encoder.reshape({self.args.imgs_layer: PartialShape([batch_size, channels, height, width])})
+        except RuntimeError:
+            log.warning('The Formula Recognition Encoder can not be reshaped, images are encoded one by one')
+            return 1
+        log.info('\tEncoder batch size: {}'.format(batch_size))
+        return batch_size
+
+    def _encoder_batch(self, images):
+        batch = cv.dnn.blobFromImages(images)
+        if len(images) < self.encoder_batch_size:
+            batch = np.pad(batch, [(0, self.encoder_batch_size - len(images))] + [(0, 0)] * 3)
+        return batch
+
+    def _on_frame_encoded(self, infer_request, _):
+        try:
+            self.encoder_results.append(self._get_encoder_outputs(infer_request))
+        except Exception as e:
+            self.callback_exceptions.append(e)
 
-    def _async_infer_decoder(self, row_enc_out, dec_st_c, dec_st_h, output, tgt):
+    def _on_batch_encoded(self, infer_request, batch_info):
+        try:
+            first_image_id, num_images = batch_info
+            outputs = {layer: infer_request.get_tensor(layer).data for layer, _ in self.encoder_to_decoder}
+            encoder_results = {first_image_id + i: {layer: data[i:i + 1].copy() for layer, data in outputs.items()}
+                               for i in range(num_images)}
+        except Exception as e:
+            with self.image_encoded:
+                self.callback_exceptions.append(e)
+                self.image_encoded.notify()
+            return
+        with self.image_encoded:
+            self.encoder_results.update(encoder_results)
+            self.image_encoded.notify()
+
+    def _get_encoder_outputs(self, infer_request):
+        return {layer: infer_request.get_tensor(layer).data.copy()
+                for layer, _ in self.encoder_to_decoder}
+
+    def _bind_decoder_inputs(self):
+        """
+        Binds decoder inputs to arrays sharing memory with the decoder infer request,
+        so inputs are not copied on every decoder step
+        """
+        decoder_inputs = {}
+        for layer in (self.args.row_enc_out_layer, self.args.dec_st_c_layer, self.args.dec_st_h_layer,
+                      self.args.output_prev_layer, self.args.tgt_layer):
+            data = self.infer_request_decoder.get_tensor(layer).data
+            decoder_inputs[layer] = np.zeros(data.shape, dtype=data.dtype)
+            self.infer_request_decoder.set_tensor(layer, Tensor(decoder_inputs[layer], shared_memory=True))
+        return decoder_inputs
+
+    def _async_infer_decoder(self):
         self.num_infers_decoder += 1
-        self.infer_request_decoder.start_async(inputs={self.args.row_enc_out_layer: row_enc_out,
-                                                       self.args.dec_st_c_layer: dec_st_c,
-                                                       self.args.dec_st_h_layer: dec_st_h,
-                                                       self.args.output_prev_layer: output,
-                                                       self.args.tgt_layer: tgt
-                                                       }
-                                               )
+        self.infer_request_decoder.start_async()
 
     def infer_async(self, model_input):
-        model_input = change_layout(model_input)
+        """
+        Encodes the next frame while the previous one is being decoded,
+        so capture, preprocessing, encoding and decoding overlap.
+        """
         assert self.is_async
-        if self.model_status == Model.Status.READY:
-            self._start_encoder(model_input)
-            return None
+        if self.callback_exceptions:
+            raise self.callback_exceptions[0]
+        if not self.encoder_results and self.encoder_queue.is_ready():
+            self.encoder_queue.start_async({self.args.imgs_layer: change_layout(model_input)})
 
-        if self.model_status == Model.Status.ENCODER_INFER:
-            infer_status_encoder = self.infer_request_encoder.wait_for(0)
-            if infer_status_encoder:
-                self._start_decoder()
+        if self.model_status == Model.Status.READY:
+            if self.encoder_results:
+                self._start_decoder(self.encoder_results.popleft())
             return None
 
         return self._process_decoding_results()
 
-    def infer_sync(self, model_input):
+    def infer_sync(self, images):
+        """
+        Generator which yields decoding results in the order of the images.
+        While an image is being decoded, the next ones are encoded in parallel,
+        at most one batch per encoder infer request
+        """
         assert not self.is_async
-        model_input = change_layout(model_input)
-        self._start_encoder(model_input)
-        self.infer_request_encoder.wait()
-        self._start_decoder()
-        res = None
-        while res is None:
-            res = self._process_decoding_results()
-        return res
+        batch_size = self.encoder_batch_size
+        max_prefetched = len(self.encoder_queue) * batch_size
+        num_submitted = 0
+        for image_id in range(len(images)):
+            while num_submitted < min(len(images), image_id + max_prefetched):
+                batch = images[num_submitted:num_submitted + batch_size]
+                self.encoder_queue.start_async({self.args.imgs_layer: self._encoder_batch(batch)},
+                                               (num_submitted, len(batch)))
+                num_submitted += len(batch)
+            with self.image_encoded:
+                self.image_encoded.wait_for(lambda: image_id in self.encoder_results or self.callback_exceptions)
+                if self.callback_exceptions:
+                    raise self.callback_exceptions[0]
+                encoder_outputs = self.encoder_results.pop(image_id)
+            yield self._decode_sync(encoder_outputs)
+
+    def _decode_sync(self, encoder_outputs):
+        self._unpack_enc_results(encoder_outputs)
+        for _ in range(self.args.max_formula_len):
+            self.num_infers_decoder += 1
+            self.infer_request_decoder.infer()
+            self._unpack_dec_results()
+            if self.tgt[0, 0] == END_TOKEN or self.prob < self.min_prob:
+                break
+        return self._finish_decoding()
 
     def _process_decoding_results(self):
-        timeout = 0 if self.is_async else -1
-        infer_status_decoder = self.infer_request_decoder.wait_for(timeout)
-        if not infer_status_decoder and self.is_async:
+        if not self.infer_request_decoder.wait_for(0):
             return None
         self._unpack_dec_results()
 
-        if self.tgt[0][0][0] == END_TOKEN or self.num_infers_decoder >= self.args.max_formula_len:
-            self.num_infers_decoder = 0
-            self.logits = np.array(self.logits)
-            logits = self.logits.squeeze(axis=1)
-            targets = np.argmax(logits, axis=1)
-            self.model_status = Model.Status.READY
-            return logits, targets
-        self._async_infer_decoder(self.row_enc_out,
-                                  self.dec_states_c,
-                                  self.dec_states_h,
-                                  self.output,
-                                  self.tgt.squeeze(axis=0)
-                                  )
+        if (self.tgt[0, 0] == END_TOKEN or self.num_infers_decoder >= self.args.max_formula_len
+                or self.prob < self.min_prob):
+            return self._finish_decoding()
+        self._async_infer_decoder()
 
         return None
 
-    def _start_encoder(self, model_input):
-        self._async_infer_encoder(model_input)
-        self.model_status = Model.Status.ENCODER_INFER
+    def _finish_decoding(self):
+        logits = self.logits[:self.num_infers_decoder]
+        self.num_infers_decoder = 0
+        targets = np.argmax(logits, axis=1)
+        self.model_status = Model.Status.READY
+        return logits, targets
 
-    def _start_decoder(self):
-        self._unpack_enc_results()
-        self._async_infer_decoder(self.row_enc_out, self.dec_states_c, self.dec_states_h, self.output, self.tgt)
+    def _start_decoder(self, encoder_outputs):
+        self._unpack_enc_results(encoder_outputs)
+        self._async_infer_decoder()
         self.model_status = Model.Status.DECODER_INFER
 
     def _unpack_dec_results(self):
-        self.dec_states_h = self.infer_request_decoder.get_tensor(self.args.dec_st_h_t_layer).data[:]
-        self.dec_states_c = self.infer_request_decoder.get_tensor(self.args.dec_st_c_t_layer).data[:]
-        self.output = self.infer_request_decoder.get_tensor(self.args.output_layer).data[:]
-        logit = self.infer_request_decoder.get_tensor(self.args.logit_layer).data[:]
-        self.logits.append(copy.deepcopy(logit))
-        self.tgt = np.array([[np.argmax(logit, axis=1)]])
-
-    def _unpack_enc_results(self):
-        self.row_enc_out = self.infer_request_encoder.get_tensor(self.args.row_enc_out_layer).data[:]
-        self.dec_states_h = self.infer_request_encoder.get_tensor(self.args.hidden_layer).data[:]
-        self.dec_states_c = self.infer_request_encoder.get_tensor(self.args.context_layer).data[:]
-        self.output = self.infer_request_encoder.get_tensor(self.args.init_0_layer).data[:]
-        self.tgt = np.array([[START_TOKEN]])
-        self.logits = []
+        infer_request = self.infer_request_decoder
+        for output_layer, input_layer in self.decoder_states:
+            np.copyto(self.decoder_inputs[input_layer], infer_request.get_tensor(output_layer).data)
+        logit = infer_request.get_tensor(self.logit_layer).data
+        self.logits[self.num_infers_decoder - 1] = logit[0]
+        token = logit[0].argmax()
+        self.tgt[0, 0] = token
+        self.prob *= float(logit[0, token])
+
+    def _unpack_enc_results(self, encoder_outputs):
+        for output_layer, input_layer in self.encoder_to_decoder:
+            np.copyto(self.decoder_inputs[input_layer], encoder_outputs[output_layer])
+        self.tgt[0, 0] = START_TOKEN
+        self.prob = 1.0
 
 
 class Renderer:
@@ -343,6 +467,10 @@ class Vocab:
             vocab_dict['id2sign'] = {int(k): v for k, v in vocab_dict['id2sign'].items()}
 
         self.id2sign = vocab_dict["id2sign"]
+        # dense lookup table, the last entry is used for the tokens missing in the vocab
+        self._signs = np.full(max(self.id2sign) + 2, "?", dtype=object)
+        for token, sign in self.id2sign.items():
+            self._signs[token] = sign
 
     def construct_phrase(self, indices):
         """Function to get latex formula from sequence of tokens
@@ -353,10 +481,8 @@ class Vocab:
         Returns:
             str: decoded formula
         """
-        phrase_converted = []
-        for token in indices:
-            if token == END_TOKEN:
-                break
-            phrase_converted.append(
-                self.id2sign.get(token, "?"))
-        return " ".join(phrase_converted)
+        indices = np.minimum(np.asarray(indices, dtype=np.intp), len(self._signs) - 1)
+        end_positions = np.flatnonzero(indices == END_TOKEN)
+        if end_positions.size:
+            indices = indices[:end_positions[0]]
+        return " ".join(self._signs[indices].tolist())
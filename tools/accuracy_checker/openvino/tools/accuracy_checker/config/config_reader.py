@@ -16,33 +16,36 @@ limitations under the License.
 
 from argparse import Namespace
 import copy
+from functools import lru_cache
+from multiprocessing.dummy import Pool as ThreadPool
 from pathlib import Path
 import os
+import stat
 
 import warnings
 
-from ..utils import read_yaml, to_lower_register, contains_any, is_iterable
+from ..utils import read_yaml, to_lower_register, is_iterable
 from .config_validator import ConfigError
 
 ENTRIES_PATHS = {
     'launchers': {
-        'cpu_extensions': 'extensions',
-        'gpu_extensions': 'extensions',
-        'affinity_map': 'affinity_map',
-        'predictions': 'source'
+        'cpu_extensions': ['extensions'],
+        'gpu_extensions': ['extensions'],
+        'affinity_map': ['affinity_map'],
+        'predictions': ['source']
     },
     'datasets': {
-        'segmentation_masks_source': 'source',
-        'annotation': 'annotations',
-        'dataset_meta': 'annotations',
-        'data_source': 'source',
-        'additional_data_source': 'source',
-        "subset_file": "annotations"
+        'segmentation_masks_source': ['source'],
+        'annotation': ['annotations'],
+        'dataset_meta': ['annotations'],
+        'data_source': ['source'],
+        'additional_data_source': ['source'],
+        "subset_file": ["annotations"]
     },
 }
 
 PREPROCESSING_PATHS = {
-    'mask_dir': 'source',
+    'mask_dir': ['source'],
     'vocabulary_file': ['model_attributes', 'models', 'source'],
     'merges_file': ['model_attributes', 'source', 'models']
 }
@@ -65,13 +68,17 @@ ANNOTATION_CONVERSION_PATHS = {
 }
 
 LIST_ENTRIES_PATHS = {
-    'model': 'models',
-    'weights': 'models',
+    'model': ['models'],
+    'weights': ['models'],
     'color_coeff': ['model_attributes', 'models'],
-    'saved_model_dir': 'models',
-    'params': 'models'
+    'saved_model_dir': ['models'],
+    'params': ['models']
 }
 
+NETWORK_INFO_ENTRIES_PATHS = {**ENTRIES_PATHS['launchers'], **LIST_ENTRIES_PATHS}
+LAUNCHER_PATH_KEYS = frozenset(ENTRIES_PATHS['launchers'])
+DATASET_PATH_KEYS = frozenset(ENTRIES_PATHS['datasets'])
+
 COMMAND_LINE_ARGS_AS_ENV_VARS = {
     'source': 'DATA_DIR',
     'annotations': 'ANNOTATIONS_DIR',
@@ -82,6 +89,8 @@ COMMAND_LINE_ARGS_AS_ENV_VARS = {
 }
 DEFINITION_ENV_VAR = 'DEFINITIONS_FILE'
 CONFIG_SHARED_PARAMETERS = []
+MAX_PATHS_PROCESSING_THREADS = 8
+MIN_MODELS_FOR_PATHS_PROCESSING_THREADS = 64
 ACCEPTABLE_MODEL = [
     'model',
     'saved_model_dir',
@@ -120,9 +129,11 @@ class ConfigReader:
     def process_config(config, mode='models', arguments=None):
         if arguments is None:
             arguments = {}
-        ConfigReader._merge_paths_with_prefixes(arguments, config, mode)
-        ConfigReader._provide_cmd_arguments(arguments, config, mode)
-        ConfigReader._filter_launchers(config, arguments, mode)
+        # namespace attributes dict is used as is, so values filled from environment are visible in both forms
+        args = arguments if isinstance(arguments, dict) else vars(arguments)
+        ConfigReader._merge_paths_with_prefixes(args, config, mode)
+        ConfigReader._provide_cmd_arguments(arguments, config, mode, args)
+        ConfigReader._filter_launchers(config, args, mode)
         ConfigReader._separate_evaluations(config, mode)
         ConfigReader._previous_configuration_parameters_sharing(config, mode)
 
@@ -131,19 +142,19 @@ class ConfigReader:
         local_config = read_yaml(arguments.config)
         if not isinstance(local_config, dict):
             raise ConfigError('local config should be dict-like object')
+        if 'definitions' in arguments and arguments.definitions:
+            return read_cached_yaml(arguments.definitions), local_config
         definitions = os.environ.get(DEFINITION_ENV_VAR) or local_config.get('global_definitions')
         if definitions:
-            definitions = read_yaml(Path(arguments.config).parent / definitions)
-        global_config = (
-            read_yaml(arguments.definitions) if 'definitions' in arguments and arguments.definitions else definitions
-        )
+            definitions = read_cached_yaml(Path(arguments.config).parent / definitions)
+        global_config = definitions
 
         return global_config, local_config
 
     @staticmethod
     def check_local_config(config):
         def _is_requirements_missed(target, requirements):
-            return list(filter(lambda entry: not target.get(entry), requirements))
+            return next((entry for entry in requirements if not target.get(entry)), None)
 
         def _check_models_config(config):
             models = config.get('models')
@@ -154,11 +165,16 @@ class ConfigReader:
             required_dataset_entries = ['name']
             required_dataset_error = 'Model {} must specify {} for each dataset'
             for model in models:
-                if _is_requirements_missed(model, required_model_entries):
-                    raise ConfigError('Each model must specify {}'.format(', '.join(required_model_entries)))
-                datasets = model['datasets'].values() if isinstance(model['datasets'], dict) else model['datasets']
-                if list(filter(lambda entry: _is_requirements_missed(entry, required_dataset_entries), datasets)):
-                    raise ConfigError(required_dataset_error.format(model['name'], ', '.join(required_dataset_entries)))
+                missed = _is_requirements_missed(model, required_model_entries)
+                if missed:
+                    raise ConfigError('Each model must specify {}'.format(missed))
+                missed_in_datasets = (
+                    _is_requirements_missed(dataset, required_dataset_entries)
+                    for _, dataset in iter_datasets(model['datasets'])
+                )
+                missed = next((entry for entry in missed_in_datasets if entry), None)
+                if missed:
+                    raise ConfigError(required_dataset_error.format(model['name'], missed))
 
         def _check_module_config(config):
             required_entries = ['name', 'module']
@@ -166,8 +182,9 @@ class ConfigReader:
             if not evaluations:
                 raise ConfigError('Missed "{}" in local config'.format('evaluations'))
             for evaluation in evaluations:
-                if _is_requirements_missed(evaluation, required_entries):
-                    raise ConfigError('Each evaluations must specify {}'.format(', '.join(required_entries)))
+                missed = _is_requirements_missed(evaluation, required_entries)
+                if missed:
+                    raise ConfigError('Each evaluations must specify {}'.format(missed))
 
         config_checkers = {
             'evaluations': _check_module_config,
@@ -192,122 +209,115 @@ class ConfigReader:
         if not global_configs or 'datasets' not in global_configs:
             return
 
-        datasets = global_configs['datasets']
-
-        def merge(local_entries, global_entries, identifier):
-            if not local_entries or not global_entries:
-                return
-
-            for i, local in enumerate(local_entries):
-                local_identifier = local.get(identifier)
-                if not local_identifier:
-                    continue
-
-                local_entries[i] = ConfigReader._merge_configs_by_identifier(global_entries, local, identifier)
-
-        for dataset in datasets:
-            merge(dataset.get('preprocessing'), global_configs.get('preprocessing'), 'type')
-            merge(dataset.get('metrics'), global_configs.get('metrics'), 'type')
-            merge(dataset.get('postprocessing'), global_configs.get('postprocessing'), 'type')
+        for entries_type in ('preprocessing', 'metrics', 'postprocessing'):
+            if not global_configs.get(entries_type):
+                continue
+            index = ConfigReader._index_by(global_configs[entries_type], 'type')
+            for dataset in global_configs['datasets']:
+                if dataset.get(entries_type):
+                    dataset[entries_type] = ConfigReader._merge_entries(index, dataset[entries_type], 'type')
 
     @staticmethod
     def _merge_models_config(global_configs, local_config, arguments):
-        config = copy.deepcopy(local_config)
+        # merged entries are fresh objects, so only containers whose slots are replaced need own copies
+        config = {**local_config, 'models': [dict(model) for model in local_config['models']]}
         if not global_configs:
             return config
 
-        models = config['models']
-        for model in models:
+        global_launchers = ConfigReader._index_by(global_configs.get('launchers'), 'framework')
+        global_datasets = ConfigReader._index_by(global_configs.get('datasets'), 'name')
+        for model in config['models']:
             if 'launchers' in global_configs:
-                for i, launcher_entry in enumerate(model['launchers']):
-                    model['launchers'][i] = ConfigReader._merge_configs_by_identifier(
-                        global_configs['launchers'], launcher_entry, 'framework'
-                    )
+                model['launchers'] = ConfigReader._merge_entries(global_launchers, model['launchers'], 'framework')
             if 'datasets' in global_configs:
-                datasets_iterator = (
-                    model['datasets'].items() if isinstance(model['datasets'], dict)
-                    else enumerate(model['datasets'])
-                )
-                for i, dataset in datasets_iterator:
-                    model['datasets'][i] = ConfigReader._merge_configs_by_identifier(
-                        global_configs['datasets'], dataset, 'name'
-                    )
+                model['datasets'] = ConfigReader._merge_entries(global_datasets, model['datasets'], 'name')
 
-        config['models'] = models
         return config
 
     @staticmethod
     def _merge_module_config(global_config, local_config, args):
-
-        config = copy.deepcopy(local_config)
+        config = {
+            **local_config,
+            'evaluations': [
+                dict(evaluation, module_config=dict(evaluation['module_config']))
+                if 'module_config' in evaluation else dict(evaluation)
+                for evaluation in local_config['evaluations']
+            ]
+        }
         if not global_config:
             return config
 
+        global_launchers = ConfigReader._index_by(global_config.get('launchers'), 'framework')
+        global_datasets = ConfigReader._index_by(global_config.get('datasets'), 'name')
         for evaluation in config['evaluations']:
             if 'module_config' not in evaluation:
                 continue
             module_config = evaluation['module_config']
             if 'launchers' in module_config and 'launchers' in global_config:
-                for i, launcher_entry in enumerate(module_config['launchers']):
-                    module_config['launchers'][i] = ConfigReader._merge_configs_by_identifier(
-                        global_config['launchers'], launcher_entry, 'framework'
-                    )
+                module_config['launchers'] = ConfigReader._merge_entries(
+                    global_launchers, module_config['launchers'], 'framework'
+                )
             if 'datasets' in module_config and 'datasets' in global_config:
-                datasets_iterator = (
-                    module_config['datasets'].items() if isinstance(module_config['datasets'], dict)
-                    else enumerate(module_config['datasets'])
+                module_config['datasets'] = ConfigReader._merge_entries(
+                    global_datasets, module_config['datasets'], 'name'
                 )
-                for i, dataset in datasets_iterator:
-                    module_config['datasets'][i] = ConfigReader._merge_configs_by_identifier(
-                        global_config['datasets'], dataset, 'name'
-                    )
 
         return config
 
     @staticmethod
     def _merge_configs(global_configs, local_config, arguments, mode='models'):
-        functors_by_mode = {
-            'models': ConfigReader._merge_models_config,
-            'evaluations': ConfigReader._merge_module_config
-        }
+        merge_func = ConfigReader._merge_models_config if mode == 'models' else ConfigReader._merge_module_config
 
-        return functors_by_mode[mode](global_configs, local_config, arguments)
+        return merge_func(global_configs, local_config, arguments)
 
     @staticmethod
-    def _merge_configs_by_identifier(global_config, local_config, identifier):
-        local_identifier = local_config.get(identifier)
-        if local_identifier is None:
-            return local_config
-
-        matched = []
-        for config in global_config:
+    def _index_by(configs, identifier):
+        index = {}
+        for config in configs or []:
             global_identifier = config.get(identifier)
-            if global_identifier is None:
-                continue
+            if global_identifier is not None:
+                index.setdefault(global_identifier, config)
 
-            if global_identifier != local_identifier:
-                continue
+        return index
+
+    @staticmethod
+    def _merge_entries(index, local_entries, identifier):
+        # merged entries are placed to a copy of list or dict, so local config containers stay untouched
+        entries = copy.copy(local_entries)
+        for i, entry in iter_datasets(entries):
+            entries[i] = ConfigReader._merge_configs_by_indexed_identifier(index, entry, identifier)
 
-            matched.append(config)
+        return entries
 
-        config = copy.deepcopy(matched[0] if matched else {})
-        for key, value in local_config.items():
-            config[key] = value
+    @staticmethod
+    def _merge_configs_by_indexed_identifier(index, local_config, identifier):
+        local_identifier = local_config.get(identifier)
+        if local_identifier is None:
+            return local_config
+
+        global_config = index.get(local_identifier, {})
+        config = {key: copy.deepcopy(value) for key, value in global_config.items() if key not in local_config}
+        config.update(local_config)
 
         return config
 
     @staticmethod
     def _merge_paths_with_prefixes(arguments, config, mode='models'):
         args = arguments if isinstance(arguments, dict) else vars(arguments)
-        for argument, env_var in COMMAND_LINE_ARGS_AS_ENV_VARS.items():
-            if argument not in args or args[argument] is None:
-                env_var_value = os.environ.get(env_var)
-                if env_var_value is not None:
-                    args[argument] = Path(env_var_value)
+        _path_mode.cache_clear()
+        missed_arguments = [argument for argument in COMMAND_LINE_ARGS_AS_ENV_VARS if args.get(argument) is None]
+        args.update(paths_from_env(missed_arguments))
 
         def process_models(config, entries_paths):
-            for model in config['models']:
-                process_config(model, entries_paths, args)
+            models = config['models']
+            # starting threads costs more than merging paths of a few models with memoized file system probes
+            if len(models) < MIN_MODELS_FOR_PATHS_PROCESSING_THREADS:
+                for model in models:
+                    process_config(model, entries_paths, args)
+                return
+            # path existence checks may block on network file systems, each model is updated by one thread only
+            with ThreadPool(min(MAX_PATHS_PROCESSING_THREADS, len(models))) as pool:
+                pool.map(lambda model: process_config(model, entries_paths, args), models)
 
         def process_modules(config, entries_paths):
             for evaluation in config['evaluations']:
@@ -319,21 +329,15 @@ class ConfigReader:
                     networks_info = module_config['network_info']
                     if isinstance(networks_info, dict):
                         for _, params in networks_info.items():
-                            entries_paths['launchers'].update(LIST_ENTRIES_PATHS)
-                            merge_entry_paths(entries_paths['launchers'], params, args)
+                            merge_entry_paths(NETWORK_INFO_ENTRIES_PATHS, params, args)
                     if isinstance(networks_info, list):
                         merge_entry_paths(entries_paths['launchers'], networks_info, args)
 
-        functors_by_mode = {
-            'models': process_models,
-            'evaluations': process_modules
-        }
-
-        processing_func = functors_by_mode[mode]
-        processing_func(config, ENTRIES_PATHS.copy())
+        processing_func = process_models if mode == 'models' else process_modules
+        processing_func(config, ENTRIES_PATHS)
 
     @staticmethod
-    def _provide_cmd_arguments(arguments, config, mode):
+    def _provide_cmd_arguments(arguments, config, mode, arguments_dict):
         profile_dataset = 'profile' in arguments and arguments.profile
         profile_report_type = arguments.profile_report_type if 'profile_report_type' in arguments else 'csv'
 
@@ -375,15 +379,9 @@ class ConfigReader:
                     dataset['_profile'] = profile_dataset
                     dataset['_report_type'] = profile_report_type
 
-        functors_by_mode = {
-            'models': merge_models,
-            'evaluations': merge_modules
-        }
-
         additional_keys = [
             'cpu_extensions_mode', 'vpu_log_level'
         ]
-        arguments_dict = arguments if isinstance(arguments, dict) else vars(arguments)
         update_launcher_entry = {}
 
         for key in additional_keys:
@@ -391,18 +389,14 @@ class ConfigReader:
             if value:
                 update_launcher_entry['_{}'.format(key)] = value
 
-        return functors_by_mode[mode](config, arguments, update_launcher_entry)
+        merge_func = merge_models if mode == 'models' else merge_modules
 
-    @staticmethod
-    def _filter_launchers(config, arguments, mode='models'):
-        functors_by_mode = {
-            'models': filter_models,
-            'evaluations': filter_modules
-        }
+        return merge_func(config, arguments, update_launcher_entry)
 
-        args = arguments if isinstance(arguments, dict) else vars(arguments)
+    @staticmethod
+    def _filter_launchers(config, args, mode='models'):
         target_devices = to_lower_register(args.get('target_devices') or [])
-        filtering_mode = functors_by_mode[mode]
+        filtering_mode = filter_models if mode == 'models' else filter_modules
         filtering_mode(config, target_devices, args)
 
     @staticmethod
@@ -417,17 +411,14 @@ class ConfigReader:
                 if len(launchers) == 1 and len(datasets) == 1:
                     evaluations.append(model)
                     continue
-                for launcher in model['launchers']:
-                    model_evaluations = []
-                    model_config_copy_launcher = copy.deepcopy(model)
-                    model_config_copy_launcher['launchers'] = [launcher]
-
-                    for dataset in model_config_copy_launcher['datasets']:
-                        model_config_copy_dataset = copy.deepcopy(model_config_copy_launcher)
-                        model_config_copy_dataset['datasets'] = [dataset]
-                        model_evaluations.append(model_config_copy_dataset)
-
-                    evaluations.extend(model_evaluations)
+                base = copy.deepcopy(
+                    {key: value for key, value in model.items() if key not in ('launchers', 'datasets')}
+                )
+                for launcher in launchers:
+                    for dataset in datasets:
+                        evaluations.append({
+                            **base, 'launchers': [copy.deepcopy(launcher)], 'datasets': [copy.deepcopy(dataset)]
+                        })
 
             models_config['models'] = evaluations
 
@@ -441,71 +432,51 @@ class ConfigReader:
                 module_config = evaluation['module_config']
                 launchers = module_config.get('launchers', [])
                 datasets = module_config.get('datasets', [])
-                eval_config_list = []
+                # evaluators update module parts (e.g. network_info) in place, so every evaluation owns its copy,
+                # but launchers and datasets are copied only into the slot they occupy
+                evaluation_base = {key: value for key, value in evaluation.items() if key != 'module_config'}
+                module_base = {key: value for key, value in module_config.items() if key != 'launchers'}
+                if datasets:
+                    module_base.pop('datasets')
                 for launcher in launchers:
-                    copy_module_config = copy.deepcopy(module_config)
-                    copy_module_config['launchers'] = [launcher]
-                    if not datasets:
-                        eval_config_list.append(copy_module_config)
-                        continue
-                    for dataset in datasets:
-                        copy_evaluation_for_dataset = copy.deepcopy(copy_module_config)
-                        copy_evaluation_for_dataset['datasets'] = [dataset]
-                        eval_config_list.append(copy_evaluation_for_dataset)
-                for eval_config in eval_config_list:
-                    copy_evaluation = copy.deepcopy(evaluation)
-                    copy_evaluation['module_config'] = eval_config
-                    eval_list.append(copy_evaluation)
+                    for dataset in datasets or [None]:
+                        eval_config = copy.deepcopy(module_base)
+                        eval_config['launchers'] = [copy.deepcopy(launcher)]
+                        if dataset is not None:
+                            eval_config['datasets'] = [copy.deepcopy(dataset)]
+                        copy_evaluation = copy.deepcopy(evaluation_base)
+                        copy_evaluation['module_config'] = eval_config
+                        eval_list.append(copy_evaluation)
 
             modules_config['evaluations'] = eval_list
 
-        mode_func = {
-            'models': _separate_models_evaluations,
-            'evaluations': _separate_modules_evaluations
-        }
-
-        separator = mode_func.get(mode)
-        if not separator:
-            return
-        separator(config)
+        if mode == 'models':
+            _separate_models_evaluations(config)
+        elif mode == 'evaluations':
+            _separate_modules_evaluations(config)
 
     @staticmethod
     def _previous_configuration_parameters_sharing(config, mode='models'):
-        def _share_params_models(models_config):
-            shared_params = {parameter: None for parameter in CONFIG_SHARED_PARAMETERS}
-            for model in models_config['models']:
-                launchers = model['launchers']
-                if not launchers:
-                    continue
-                for launcher in model['launchers']:
-                    for parameter in CONFIG_SHARED_PARAMETERS:
-                        if parameter in launcher:
-                            if shared_params[parameter] is not None:
-                                launcher['_prev_{}'.format(parameter)] = shared_params[parameter]
-                            shared_params[parameter] = launcher[parameter]
-
-        def _share_params_modules(modules_config):
-            shared_params = {parameter: None for parameter in CONFIG_SHARED_PARAMETERS}
-            for evaluation in modules_config['evaluations']:
-                if 'module_config' not in evaluation:
-                    continue
-                launchers = evaluation['module_config'].get('launchers')
-                for launcher in launchers:
-                    for parameter in CONFIG_SHARED_PARAMETERS:
-                        if parameter in launcher:
-                            if shared_params[parameter] is not None:
-                                launcher['_prev_{}'.format(parameter)] = shared_params[parameter]
-                            shared_params[parameter] = launcher[parameter]
-
-        mode_func = {
-            'models': _share_params_models,
-            'evaluations': _share_params_modules,
-        }
+        if not CONFIG_SHARED_PARAMETERS:
+            return
 
-        processor = mode_func.get(mode)
-        if not processor:
+        if mode == 'models':
+            launchers_lists = (model['launchers'] for model in config['models'])
+        elif mode == 'evaluations':
+            launchers_lists = (
+                evaluation['module_config'].get('launchers') for evaluation in config['evaluations']
+                if 'module_config' in evaluation
+            )
+        else:
             return
-        processor(config)
+        shared_params = {parameter: None for parameter in CONFIG_SHARED_PARAMETERS}
+        for launchers in launchers_lists:
+            for launcher in launchers or []:
+                for parameter in CONFIG_SHARED_PARAMETERS:
+                    if parameter in launcher:
+                        if shared_params[parameter] is not None:
+                            launcher['_prev_{}'.format(parameter)] = shared_params[parameter]
+                        shared_params[parameter] = launcher[parameter]
 
     @staticmethod
     def convert_paths(config):
@@ -513,18 +484,16 @@ class ConfigReader:
         definitions = os.environ.get(DEFINITION_ENV_VAR)
         args = {}
         if definitions:
-            definitions = read_yaml(Path(definitions))
+            definitions = read_cached_yaml(definitions)
             ConfigReader._prepare_global_configs(definitions)
             config = ConfigReader._merge_configs(definitions, config, {}, mode)
         ConfigReader._merge_paths_with_prefixes(args, config, mode)
         if COMMAND_LINE_ARGS_AS_ENV_VARS['kaldi_bin_dir'] in os.environ:
-            ConfigReader._provide_cmd_arguments(Namespace(**args), config, mode)
+            ConfigReader._provide_cmd_arguments(Namespace(**args), config, mode, args)
 
         def convert_launcher_paths(launcher_config):
-            for key, path in launcher_config.items():
-                if key not in ENTRIES_PATHS['launchers']:
-                    continue
-                launcher_config[key] = Path(path)
+            for key in LAUNCHER_PATH_KEYS & launcher_config.keys():
+                launcher_config[key] = Path(launcher_config[key])
             adapter_config = launcher_config.get('adapter')
             if isinstance(adapter_config, dict):
                 command_line_adapter = (create_command_line_mapping(adapter_config, None))
@@ -544,17 +513,14 @@ class ConfigReader:
                     for path in path_preprocessing:
                         preprocessor[path] = Path(preprocessor[path])
 
-            for key, path in dataset_config.items():
-                if key not in ENTRIES_PATHS['datasets']:
-                    continue
-                dataset_config[key] = Path(path)
+            for key in DATASET_PATH_KEYS & dataset_config.keys():
+                dataset_config[key] = Path(dataset_config[key])
 
         if mode == 'models':
             for model in config['models']:
                 for launcher_config in model['launchers']:
                     convert_launcher_paths(launcher_config)
-                datasets = model['datasets'].values() if isinstance(model['datasets'], dict) else model['datasets']
-                for dataset_config in datasets:
+                for _, dataset_config in iter_datasets(model['datasets']):
                     convert_dataset_paths(dataset_config)
         else:
             for evaluation in config['evaluations']:
@@ -563,77 +529,112 @@ class ConfigReader:
                     convert_launcher_paths(launcher_config)
                 d_config = module_config.get('datasets')
                 if d_config:
-                    datasets = d_config.values() if isinstance(d_config, dict) else d_config
-                    for dataset_config in datasets:
+                    for _, dataset_config in iter_datasets(d_config):
                         convert_dataset_paths(dataset_config)
 
         return config
 
 
+@lru_cache(maxsize=32)
+def _read_yaml_cached(yaml_file, modification_time): # pylint: disable=W0613
+    return read_yaml(yaml_file)
+
+
+def _read_shared_yaml(yaml_file):
+    yaml_file = Path(yaml_file)
+    return _read_yaml_cached(str(yaml_file), yaml_file.stat().st_mtime)
+
+
+# global definitions and device configs are parsed once until modified, callers get a copy which is safe to update
+def read_cached_yaml(yaml_file):
+    return copy.deepcopy(_read_shared_yaml(yaml_file))
+
+
+@lru_cache(maxsize=None)
+def _cached_path(value):
+    return Path(value)
+
+
+# environment is read on each call, Path objects for already seen values are reused
+def paths_from_env(arguments):
+    paths = {}
+    for argument in arguments:
+        env_var_value = os.environ.get(COMMAND_LINE_ARGS_AS_ENV_VARS[argument])
+        if env_var_value is not None:
+            paths[argument] = _cached_path(env_var_value)
+
+    return paths
+
+
 def create_command_line_mapping(config, default_value, value_map=None):
     mapping = {}
     value_map = value_map or {}
     for key, value in config.items():
-        if key.endswith('file') or key.endswith('dir'):
-            if not Path(value).is_absolute():
-                mapping[key] = value_map.get(key, default_value)
+        if value is None or not key.endswith(('file', 'dir')):
+            continue
+        if not os.path.isabs(value):
+            mapping[key] = value_map.get(key, default_value)
 
     return mapping
 
 
-def filtered(launcher, targets, args):
-    target_tags = args.get('target_tags') or []
-    target_backends = args.get('target_backends')
-    use_new_api = args.get('use_new_api', False)
+def build_filter(args, targets):
+    target_tags = set(args.get('target_tags') or [])
+    target_backends = set(args.get('target_backends') or [])
     target_framework = args.get('target_framework', '')
-    if target_framework and target_framework == 'dlsdk' and use_new_api:
+    if target_framework and target_framework == 'dlsdk' and args.get('use_new_api', False):
         target_framework = 'openvino'
-    if target_tags:
-        if not contains_any(target_tags, launcher.get('tags', [])):
+    target_framework = target_framework.lower() if target_framework else None
+    targets = set(targets or ())
+
+    def filtered(launcher):
+        if target_tags and target_tags.isdisjoint(launcher.get('tags', ())):
             return True
 
-    config_framework = launcher['framework'].lower()
-    if not target_framework:
-        target_framework = config_framework
-    target_framework = target_framework.lower()
-    if config_framework != target_framework:
-        return True
+        if target_framework and launcher['framework'].lower() != target_framework:
+            return True
 
-    if target_backends:
-        backend = launcher.get('backend')
-        if backend not in target_backends:
+        if target_backends and launcher.get('backend') not in target_backends:
             return True
 
-    return targets and launcher.get('device', '').lower() not in targets
+        return targets and launcher.get('device', '').lower() not in targets
+
+    return filtered
 
 
 def complete_openvino_launchers(launchers, use_new_api):
     if use_new_api is None:
         return launchers
-    orig_ov_launchers = []
-    updated_ov_launchers = []
-
-    for idx, launcher in enumerate(launchers):
-        fwk = launcher.get('framework')
-        if fwk not in ['openvino', 'dlsdk']:
-            continue
-        if use_new_api:
-            if fwk == 'openvino':
-                orig_ov_launchers.append(idx)
-            else:
-                updated_ov_launchers.append(idx)
-        else:
-            if fwk == 'openvino':
-                updated_ov_launchers.append(idx)
-            else:
-                orig_ov_launchers.append(idx)
-    if not orig_ov_launchers:
-        for idx in updated_ov_launchers:
-            launchers[idx]['framework'] = 'openvino' if use_new_api else 'dlsdk'
+    target_framework, source_framework = ('openvino', 'dlsdk') if use_new_api else ('dlsdk', 'openvino')
+    launchers_to_update = []
+    for launcher in launchers:
+        framework = launcher.get('framework')
+        if framework == target_framework:
+            return launchers
+        if framework == source_framework:
+            launchers_to_update.append(launcher)
+
+    for launcher in launchers_to_update:
+        launcher['framework'] = target_framework
     return launchers
 
 
+def has_filters(target_devices, args):
+    return bool(
+        target_devices or args.get('target_tags') or args.get('target_backends') or args.get('target_framework')
+        or args.get('use_new_api') is not None
+    )
+
+
 def filter_models(config, target_devices, args):
+    if not has_filters(target_devices, args):
+        for model in config['models']:
+            if not model['launchers']:
+                warnings.warn('Model "{}" has no launchers'.format(model['name']))
+        config['models'] = [model for model in config['models'] if model['launchers']]
+        return
+
+    filtered = build_filter(args, target_devices)
     models_after_filtration = []
     for model in config['models']:
         launchers_after_filtration = []
@@ -643,12 +644,11 @@ def filter_models(config, target_devices, args):
         for launcher in launchers:
             if 'device' not in launcher and target_devices:
                 for device in target_devices:
-                    launcher_with_device = copy.deepcopy(launcher)
-                    launcher_with_device['device'] = device
-                    if not filtered(launcher_with_device, target_devices, args):
+                    launcher_with_device = {**launcher, 'device': device}
+                    if not filtered(launcher_with_device):
                         launchers_after_filtration.append(launcher_with_device)
                 continue
-            if not filtered(launcher, target_devices, args):
+            if not filtered(launcher):
                 launchers_after_filtration.append(launcher)
 
         if not launchers_after_filtration:
@@ -662,6 +662,13 @@ def filter_models(config, target_devices, args):
 
 
 def filter_modules(config, target_devices, args):
+    if not has_filters(target_devices, args):
+        for evaluation in config['evaluations']:
+            if 'launchers' in evaluation.get('module_config', {}) and not evaluation['module_config']['launchers']:
+                warnings.warn('Model "{}" has no launchers'.format(evaluation['name']))
+        return
+
+    filtered = build_filter(args, target_devices)
     filtered_evals = []
     for evaluation in config['evaluations']:
         if 'module_config' not in evaluation or 'launchers' not in evaluation['module_config']:
@@ -680,11 +687,10 @@ def filter_modules(config, target_devices, args):
             launchers_without_device = [launcher for launcher in launchers if 'device' not in launcher]
             for launcher in launchers_without_device:
                 for device in target_devices:
-                    launcher_with_device = copy.deepcopy(launcher)
-                    launcher_with_device['device'] = device
+                    launcher_with_device = {**launcher, 'device': device}
                     launchers.append(launcher_with_device)
         launchers = [
-            launcher for launcher in launchers if not filtered(launcher, target_devices, args)
+            launcher for launcher in launchers if not filtered(launcher)
         ]
         if not launchers:
             warnings.warn('Model "{}" has no launchers'.format(evaluation['name']))
@@ -702,48 +708,39 @@ def process_config(
             annotation_conversion_config = datasets_config.get('annotation_conversion')
             if annotation_conversion_config:
                 command_line_conversion = (create_command_line_mapping(annotation_conversion_config,
-                                                                       'source', ANNOTATION_CONVERSION_PATHS))
+                                                                       ['source'], ANNOTATION_CONVERSION_PATHS))
                 datasets_config['_command_line_mapping'] = prepare_commandline_conversion_mapping(
                     command_line_conversion, args
                 )
                 merge_entry_paths(command_line_conversion, annotation_conversion_config, args)
             if 'preprocessing' in datasets_config:
                 for preprocessor in datasets_config['preprocessing']:
-                    merge_entry_paths(create_command_line_mapping(preprocessor, 'models', PREPROCESSING_PATHS),
+                    merge_entry_paths(create_command_line_mapping(preprocessor, ['models'], PREPROCESSING_PATHS),
                                       preprocessor, args)
 
     def process_launchers(launchers_configs):
         if not isinstance(launchers_configs, list):
             launchers_configs = [launchers_configs]
+        models = args.get('models')
+        if not models and not any(isinstance(launcher.get('adapter'), dict) for launcher in launchers_configs):
+            return launchers_configs
 
+        # single models path, e.g. taken from MODELS_DIR environment variable, is merged as the only model
+        models_count = len(models) if isinstance(models, list) else 1
         updated_launchers = []
         for launcher_config in launchers_configs:
-            if ('models' not in args or not args['models']) and not isinstance(launcher_config.get('adapter'), dict):
+            if not models and not isinstance(launcher_config.get('adapter'), dict):
                 updated_launchers.append(launcher_config)
                 continue
-            models = args.get('models')
-            if isinstance(models, list):
-                for model_id, _ in enumerate(models):
-                    new_launcher = copy.deepcopy(launcher_config)
-                    merge_entry_paths(LIST_ENTRIES_PATHS, new_launcher, args, model_id)
-                    adapter_config = new_launcher.get('adapter')
-                    if isinstance(adapter_config, dict):
-                        command_line_adapter = (create_command_line_mapping(adapter_config, 'models', ADAPTERS_PATHS))
-                        merge_entry_paths(command_line_adapter, adapter_config, args, model_id)
-                    if not updated_launchers or new_launcher != updated_launchers[-1]:
-                        updated_launchers.append(new_launcher)
-            else:
-                merge_entry_paths(LIST_ENTRIES_PATHS, launcher_config, args)
-                adapter_config = launcher_config.get('adapter')
-                if isinstance(adapter_config, dict):
-                    command_line_adapter = (create_command_line_mapping(adapter_config, 'models', ADAPTERS_PATHS))
-                    merge_entry_paths(command_line_adapter, adapter_config, args)
-                updated_launchers.append(launcher_config)
+            updated_launchers.extend(_expand_model_launchers(launcher_config, models_count, args))
 
         return updated_launchers
 
-    for entry, command_line_arg in entries_paths.items():
-        entry_id = entry if not identifiers_mapping else identifiers_mapping[entry]
+    resolved_entries = (
+        [(identifiers_mapping[entry], command_line_arg) for entry, command_line_arg in entries_paths.items()]
+        if identifiers_mapping else entries_paths.items()
+    )
+    for entry_id, command_line_arg in resolved_entries:
         if entry_id not in config_item:
             continue
 
@@ -774,48 +771,86 @@ def process_config(
 
 def select_arg_path(selected_argument, value_id, argument):
     if isinstance(selected_argument, list):
-        if len(selected_argument) > 1:
-            if len(selected_argument) <= value_id:
-                raise ValueError('list of arguments for {} less than number of evaluations'.format(argument))
+        if len(selected_argument) == 1:
+            selected_argument = selected_argument[0]
+        elif value_id < len(selected_argument):
             selected_argument = selected_argument[value_id]
         else:
-            selected_argument = selected_argument[0]
-    if not isinstance(selected_argument, Path):
-        selected_argument = Path(selected_argument)
-    return selected_argument
+            raise ValueError('list of arguments for {} less than number of evaluations'.format(argument))
+    return selected_argument if isinstance(selected_argument, Path) else _cached_path(selected_argument)
+
+
+# file system probes are cached within one paths merging pass, see ConfigReader._merge_paths_with_prefixes
+@lru_cache(maxsize=512)
+def _path_mode(path):
+    try:
+        return os.stat(path).st_mode
+    except (OSError, ValueError):
+        return None
+
+
+def _expand_model_launchers(launcher_config, models_count, args):
+    """
+    Creates launcher copy with paths merged for each of models, copy repeating paths of the previous one is skipped.
+    Only top level path entries and adapter paths are replaced in the copy, other sections stay shared.
+    """
+    adapter_config = launcher_config.get('adapter')
+    command_line_adapter = (
+        create_command_line_mapping(adapter_config, ['models'], ADAPTERS_PATHS) if isinstance(adapter_config, dict)
+        else {}
+    )
+    launchers, prev_paths = [], None
+    for model_id in range(models_count):
+        new_launcher = dict(launcher_config)
+        merge_entry_paths(LIST_ENTRIES_PATHS, new_launcher, args, model_id)
+        if command_line_adapter:
+            new_launcher['adapter'] = dict(adapter_config)
+            merge_entry_paths(command_line_adapter, new_launcher['adapter'], args, model_id)
+        launcher_paths = (
+            tuple(new_launcher.get(field) for field in LIST_ENTRIES_PATHS)
+            + tuple(new_launcher['adapter'][field] for field in command_line_adapter)
+        )
+        if launcher_paths != prev_paths:
+            launchers.append(new_launcher)
+        prev_paths = launcher_paths
+
+    return launchers
 
 
 def merge_entry_paths(keys, value, args, value_id=0):
+    """
+    Merges relative paths in value with prefixes from command line arguments.
+    Keys map config fields to lists of candidate arguments, tried in order.
+    """
     for field, argument in keys.items():
         if not is_iterable(value) or field not in value:
             continue
 
-        config_path = Path(value[field])
-        if config_path.is_absolute():
-            value[field] = Path(value[field])
+        config_path = value[field]
+        if os.path.isabs(config_path):
+            value[field] = Path(config_path)
             continue
-        argument_list = argument
-
-        if not isinstance(argument, list):
-            argument_list = [argument]
-
         selected_argument = None
-        for arg_candidate in argument_list:
-
+        for arg_candidate in argument:
             if arg_candidate not in args or not args[arg_candidate]:
                 continue
 
-            selected_argument = select_arg_path(args[arg_candidate], value_id, argument)
+            selected_argument = select_arg_path(args[arg_candidate], value_id, arg_candidate)
             prefix_path = selected_argument
-            if not selected_argument.is_dir():
+            prefix_mode = _path_mode(os.fspath(selected_argument))
+            if prefix_mode is None or not stat.S_ISDIR(prefix_mode):
                 if arg_candidate in ALLOW_FILE_OR_DIR:
                     prefix_path = selected_argument.parent
                 else:
-                    raise ConfigError('argument: {} should be a directory'.format(argument))
+                    raise ConfigError('argument: {} should be a directory'.format(arg_candidate))
 
-            if (prefix_path / config_path).exists():
+            if _path_mode(os.path.join(prefix_path, config_path)) is not None:
                 break
-        value[field] = selected_argument / config_path if selected_argument is not None else config_path
+        value[field] = selected_argument / config_path if selected_argument is not None else Path(config_path)
+
+
+def iter_datasets(datasets):
+    return datasets.items() if isinstance(datasets, dict) else enumerate(datasets)
 
 
 def get_mode(config):
@@ -830,17 +865,18 @@ def get_mode(config):
 
 def merge_dlsdk_launcher_args(arguments, launcher_entry, update_launcher_entry):
     def _async_evaluation_args(launcher_entry):
-        if 'async_mode' in arguments:
+        if hasattr(arguments, 'async_mode'):
             launcher_entry['async_mode'] = arguments.async_mode
 
-        if 'num_requests' in arguments and arguments.num_requests is not None:
-            launcher_entry['num_requests'] = arguments.num_requests
+        num_requests = _get_arg(arguments, 'num_requests')
+        if num_requests is not None:
+            launcher_entry['num_requests'] = num_requests
 
         return launcher_entry
 
-    kaldi_binaries = arguments.kaldi_bin_dir if 'kaldi_bin_dir' in arguments else None
-    kaldi_logs = arguments.kaldi_log_file if 'kaldi_log_file' in arguments else None
-    precision_hint = arguments.inference_precision_hint if 'inference_precision_hint' in arguments else None
+    kaldi_binaries = _get_arg(arguments, 'kaldi_bin_dir')
+    kaldi_logs = _get_arg(arguments, 'kaldi_log_file')
+    precision_hint = _get_arg(arguments, 'inference_precision_hint')
     if kaldi_binaries:
         launcher_entry['_kaldi_bin_dir'] = kaldi_binaries
         launcher_entry['_kaldi_log_file'] = kaldi_logs
@@ -852,69 +888,72 @@ def merge_dlsdk_launcher_args(arguments, launcher_entry, update_launcher_entry):
     launcher_entry.update(update_launcher_entry)
     _async_evaluation_args(launcher_entry)
 
-    if 'device_config' in arguments and arguments.device_config:
-        merge_device_configs(launcher_entry, arguments.device_config)
+    device_config = _get_arg(arguments, 'device_config')
+    if device_config:
+        merge_device_configs(launcher_entry, device_config)
 
-    if 'cpu_extensions' not in launcher_entry and 'extensions' in arguments and arguments.extensions:
-        extensions = arguments.extensions
+    extensions = _get_arg(arguments, 'extensions')
+    if 'cpu_extensions' not in launcher_entry and extensions:
         if not extensions.is_dir() or extensions.name == 'AUTO':
-            launcher_entry['cpu_extensions'] = arguments.extensions
+            launcher_entry['cpu_extensions'] = extensions
 
-    if 'affinity_map' not in launcher_entry and 'affinity_map' in arguments and arguments.affinity_map:
-        am = arguments.affinity_map
-        if not am.is_dir():
-            launcher_entry['affinity_map'] = arguments.affinity_map
+    affinity_map = _get_arg(arguments, 'affinity_map')
+    if 'affinity_map' not in launcher_entry and affinity_map:
+        if not affinity_map.is_dir():
+            launcher_entry['affinity_map'] = affinity_map
 
-    if 'undefined_shapes_resolving_policy' in arguments:
+    if hasattr(arguments, 'undefined_shapes_resolving_policy'):
         launcher_entry['_undefined_shapes_resolving_policy'] = arguments.undefined_shapes_resolving_policy
 
     return launcher_entry
 
 
-def _add_subset_specific_arg(dataset_entry, arguments):
-    if 'shuffle' in arguments and arguments.shuffle is not None:
-        dataset_entry['shuffle'] = arguments.shuffle
+def _get_arg(arguments, name):
+    return getattr(arguments, name, None)
+
 
-    if 'subsample_size' in arguments and arguments.subsample_size is not None:
-        dataset_entry['subsample_size'] = arguments.subsample_size
-    if 'subset_file' in arguments and arguments.subset_file is not None:
-        dataset_entry['subset_file'] = arguments.subset_file
-    if 'store_subset' in arguments and arguments.store_subset:
-        dataset_entry['store_subset'] = arguments.store_subset
+def _add_subset_specific_arg(dataset_entry, arguments):
+    for name in ('shuffle', 'subsample_size', 'subset_file'):
+        value = _get_arg(arguments, name)
+        if value is not None:
+            dataset_entry[name] = value
+    store_subset = _get_arg(arguments, 'store_subset')
+    if store_subset:
+        dataset_entry['store_subset'] = store_subset
 
 
 def prepare_commandline_conversion_mapping(commandline_conversion, args):
+    args_get = args.get
     mapping = {}
     for key, value in commandline_conversion.items():
         if not isinstance(value, list):
-            mapping[key] = args.get(value)
-        else:
-            possible_paths = []
-            for v in value:
-                if args.get(v) is None:
-                    continue
-                possible_paths.append(args[v])
-            mapping[key] = possible_paths
+            mapping[key] = args_get(value)
+            continue
+        arg_values = (args_get(arg) for arg in value)
+        mapping[key] = [arg_value for arg_value in arg_values if arg_value is not None]
 
     return mapping
 
 
 def merge_device_configs(launcher_entry, device_config_file):
+    # device configs are dicts of per device dicts or scalars, merged config is built from new dicts on both levels,
+    # so neither cached external config nor embedded config, which may be shared between launcher copies, is changed
     embedded_device_config = launcher_entry.get('device_config')
-    external_device_config = read_yaml(device_config_file)
+    external_device_config = _read_shared_yaml(device_config_file)
     if not embedded_device_config:
-        embedded_device_config = external_device_config
+        device_config = {
+            key: dict(value) if isinstance(value, dict) else value for key, value in external_device_config.items()
+        }
     elif (
         not isinstance(next(iter(external_device_config.values())), dict)
         and not isinstance(next(iter(embedded_device_config.values())), dict)
     ):
-        embedded_device_config.update(external_device_config)
+        device_config = {**embedded_device_config, **external_device_config}
     else:
+        device_config = dict(embedded_device_config)
         for key, value in external_device_config.items():
-            if key not in embedded_device_config:
-                embedded_device_config[key] = {}
-            embedded_device_config[key].update(value)
-    launcher_entry['device_config'] = embedded_device_config
+            device_config[key] = {**device_config.get(key, {}), **value}
+    launcher_entry['device_config'] = device_config
     return launcher_entry
 
 
@@ -940,18 +979,20 @@ def provide_models(launchers, arguments):
     input_layout = arguments.layout if 'layout' in arguments else None
 
     provide_precision_and_layout(launchers, input_precisions, input_layout)
-    if 'models' not in arguments or not arguments.models:
+    model_paths = _get_arg(arguments, 'models')
+    if not model_paths:
         return launchers
-    model_paths = arguments.models
+    # command line gives list of paths, but value taken from MODELS_DIR environment variable is single path
+    if not isinstance(model_paths, list):
+        model_paths = [model_paths]
     updated_launchers = []
-    model_paths = [model_paths] if not isinstance(model_paths, list) else model_paths
     for launcher in launchers:
-        if contains_any(launcher, ACCEPTABLE_MODEL):
+        if not launcher.keys().isdisjoint(ACCEPTABLE_MODEL):
             updated_launchers.append(launcher)
             continue
         for model_path in model_paths:
-            copy_launcher = copy.deepcopy(launcher)
-            copy_launcher['model'] = model_path
+            # nested sections stay shared, each launcher gets own copy when evaluations are separated
+            copy_launcher = {**launcher, 'model': model_path}
             provide_model_type(copy_launcher, arguments)
             updated_launchers.append(copy_launcher)
     return updated_launchers
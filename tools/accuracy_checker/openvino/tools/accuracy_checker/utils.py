@@ -43,6 +43,11 @@ try:
 except ImportError:
     Polygon = None
 
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
 
 def concat_lists(*lists):
     return list(itertools.chain(*lists))
@@ -314,7 +319,7 @@ def read_pickle_with_renaming(file: Union[str, Path], renaming_mapping, *args, *
 
 def read_yaml(file: Union[str, Path], *args, **kwargs):
     with get_path(file).open() as content:
-        return yaml.safe_load(content, *args, **kwargs)
+        return yaml.load(content, *args, Loader=YamlSafeLoader, **kwargs) # nosec - disable B506:yaml_load check
 
 
 def read_csv(file: Union[str, Path], *args, is_dict=True, **kwargs):
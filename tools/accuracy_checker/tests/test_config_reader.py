@@ -15,12 +15,16 @@ limitations under the License.
 """
 
 import copy
+import os
 from pathlib import Path
 from argparse import Namespace
 
 import pytest
 from .common import mock_filesystem
 from openvino.tools.accuracy_checker.config import ConfigReader, ConfigError
+from openvino.tools.accuracy_checker.config.config_reader import (
+    ENTRIES_PATHS, merge_device_configs, filter_models, complete_openvino_launchers
+)
 
 
 class TestConfigReader:
@@ -108,7 +112,7 @@ class TestConfigReader:
             'model_attributes': None
         })
         mocker.patch('openvino.tools.accuracy_checker.utils.get_path', return_value=Path.cwd())
-        mocker.patch('yaml.safe_load', return_value=config)
+        mocker.patch('yaml.load', return_value=config)
         mocker.patch('pathlib.Path.open')
 
         result = ConfigReader.merge(empty_args)
@@ -158,29 +162,29 @@ class TestConfigReader:
             ConfigReader.merge(self.arguments)
 
         error_message = str(exception.value).split(sep=': ')[-1]
-        assert error_message == 'Each model must specify {}'.format(', '.join(['name', 'launchers', 'datasets']))
+        assert error_message == 'Each model must specify name'
 
     def test_missed_launchers_in_model_raises_value_error_exception(self, mocker):
         mocker.patch(self.module + '._read_configs', return_value=(
-            self.global_config, {'models': [{'name': None, 'datasets': None}]}
+            self.global_config, {'models': [{'name': 'model', 'datasets': None}]}
         ))
 
         with pytest.raises(ConfigError) as exception:
             ConfigReader.merge(self.arguments)
 
         error_message = str(exception.value).split(sep=': ')[-1]
-        assert error_message == 'Each model must specify {}'.format(', '.join(['name', 'launchers', 'datasets']))
+        assert error_message == 'Each model must specify launchers'
 
     def test_missed_datasets_in_model_raises_value_error_exception(self, mocker):
         mocker.patch(self.module + '._read_configs', return_value=(
-            self.global_config, {'models': [{'name': None, 'launchers': None}]}
+            self.global_config, {'models': [{'name': 'model', 'launchers': [{'framework': 'dlsdk'}]}]}
         ))
 
         with pytest.raises(ConfigError) as exception:
             ConfigReader.merge(self.arguments)
 
         error_message = str(exception.value).split(sep=': ')[-1]
-        assert error_message == 'Each model must specify {}'.format(', '.join(['name', 'launchers', 'datasets']))
+        assert error_message == 'Each model must specify datasets'
 
     def test_invalid_model_raises_value_error_exception(self, mocker):
         mocker.patch(self.module + '._read_configs', return_value=(
@@ -191,7 +195,7 @@ class TestConfigReader:
             ConfigReader.merge(self.arguments)
 
         error_message = str(exception.value).split(sep=': ')[-1]
-        assert error_message == 'Each model must specify {}'.format(', '.join(['name', 'launchers', 'datasets']))
+        assert error_message == 'Each model must specify name'
 
     def test_merge_datasets_with_definitions(self, mocker):
         local_config = {'models': [{
@@ -1104,6 +1108,270 @@ class TestConfigReader:
         assert launchers[0]['device'].upper() == 'CPU'
         assert launchers[1]['device'].upper() == 'GPU'
 
+    def test_launchers_with_same_merged_paths_for_several_models_are_deduplicated(self):
+        local_config = {'models': [{
+            'name': 'model',
+            'launchers': [{
+                'framework': 'dlsdk',
+                'adapter': {'type': 'nmt', 'vocabulary_file': 'vocab.txt'}
+            }],
+            'datasets': [{'name': 'dataset'}]
+        }]}
+        with mock_filesystem(['m1/', 'm2/', 'source/vocab.txt']) as prefix:
+            args = copy.deepcopy(self.arguments)
+            args.models = [prefix / 'm1', prefix / 'm2']
+            args.source = prefix / 'source'
+            args.extensions = None
+            args.annotations = None
+
+            ConfigReader._merge_paths_with_prefixes(args, local_config)
+
+            launchers = local_config['models'][0]['launchers']
+            assert len(launchers) == 1
+            assert launchers[0]['adapter']['vocabulary_file'] == prefix / 'source' / 'vocab.txt'
+
+    def _merge_launchers_for_models(self, prefix, models):
+        local_config = {'models': [{
+            'name': 'model',
+            'launchers': [{'framework': 'dlsdk', 'model': 'model.xml', 'weights': 'model.bin'}],
+            'datasets': [{'name': 'dataset'}]
+        }]}
+        args = copy.deepcopy(self.arguments)
+        args.models = [prefix / model for model in models]
+        args.extensions = None
+        args.annotations = None
+        ConfigReader._merge_paths_with_prefixes(args, local_config)
+
+        return local_config['models'][0]['launchers']
+
+    def test_launchers_are_expanded_for_each_model_in_order(self):
+        with mock_filesystem(['m1/', 'm2/']) as prefix:
+            launchers = self._merge_launchers_for_models(prefix, ['m1', 'm2'])
+
+            assert [launcher['model'] for launcher in launchers] == [
+                prefix / 'm1' / 'model.xml', prefix / 'm2' / 'model.xml'
+            ]
+
+    def test_repeated_models_produce_one_launcher(self):
+        with mock_filesystem(['m1/']) as prefix:
+            launchers = self._merge_launchers_for_models(prefix, ['m1', 'm1'])
+
+            assert len(launchers) == 1
+            assert launchers[0]['model'] == prefix / 'm1' / 'model.xml'
+
+    def test_non_adjacent_repeated_models_produce_launcher_for_each_model_in_order(self):
+        with mock_filesystem(['m1/', 'm2/']) as prefix:
+            launchers = self._merge_launchers_for_models(prefix, ['m1', 'm2', 'm1'])
+
+            assert [launcher['model'] for launcher in launchers] == [
+                prefix / 'm1' / 'model.xml', prefix / 'm2' / 'model.xml', prefix / 'm1' / 'model.xml'
+            ]
+            assert [launcher['weights'] for launcher in launchers] == [
+                prefix / 'm1' / 'model.bin', prefix / 'm2' / 'model.bin', prefix / 'm1' / 'model.bin'
+            ]
+
+    def test_network_info_paths_merging_does_not_affect_next_configs(self):
+        entries_paths = copy.deepcopy(ENTRIES_PATHS)
+        modules_config = {'evaluations': [{
+            'name': 'pipeline',
+            'module_config': {
+                'network_info': {'encoder': {'model': 'encoder.xml'}},
+                'launchers': [{'framework': 'dlsdk'}],
+                'datasets': [{'name': 'dataset'}]
+            }
+        }]}
+        models_config = {'models': [{
+            'name': 'model',
+            'launchers': [{'framework': 'dlsdk', 'model': 'model.xml'}],
+            'datasets': [{'name': 'dataset'}]
+        }]}
+        with mock_filesystem(['models/']) as prefix:
+            modules_args = copy.deepcopy(self.arguments)
+            modules_args.models = prefix / 'models'
+            modules_args.extensions = None
+            modules_args.annotations = None
+            ConfigReader._merge_paths_with_prefixes(modules_args, modules_config, mode='evaluations')
+
+            models_args = copy.deepcopy(self.arguments)
+            models_args.models = None
+            models_args.extensions = None
+            models_args.annotations = None
+            ConfigReader._merge_paths_with_prefixes(models_args, models_config)
+
+            network_info = modules_config['evaluations'][0]['module_config']['network_info']
+            assert network_info['encoder']['model'] == prefix / 'models' / 'encoder.xml'
+            assert ENTRIES_PATHS == entries_paths
+            assert models_config['models'][0]['launchers'][0]['model'] == 'model.xml'
+
+    def test_merging_read_configs_does_not_modify_cached_definitions(self):
+        definitions = (
+            "launchers:\n"
+            "  - framework: dlsdk\n"
+            "    device: CPU\n"
+            "datasets:\n"
+            "  - name: global_dataset\n"
+            "    data_source: images\n"
+            "    preprocessing:\n"
+            "      - type: resize\n"
+        )
+        local_config = (
+            "models:\n"
+            "  - name: model\n"
+            "    launchers:\n"
+            "      - framework: dlsdk\n"
+            "    datasets:\n"
+            "      - name: global_dataset\n"
+        )
+        with mock_filesystem(['definitions.yml', 'config.yml']) as prefix:
+            (prefix / 'definitions.yml').write_text(definitions)
+            (prefix / 'config.yml').write_text(local_config)
+            arguments = Namespace(config=prefix / 'config.yml', definitions=prefix / 'definitions.yml')
+
+            global_config, local_config = ConfigReader._read_configs(arguments)
+            expected_global_config = copy.deepcopy(global_config)
+            ConfigReader._prepare_global_configs(global_config)
+            config = ConfigReader._merge_configs(global_config, local_config, self.arguments)
+            config['models'][0]['launchers'][0]['device'] = 'GPU'
+            config['models'][0]['datasets'][0]['preprocessing'].append({'type': 'crop'})
+            global_config['datasets'][0]['data_source'] = 'other_images'
+
+            assert config['models'][0]['datasets'][0]['data_source'] == 'images'
+            assert ConfigReader._read_configs(arguments)[0] == expected_global_config
+
+    def test_modified_definitions_file_is_read_again(self):
+        with mock_filesystem(['definitions.yml', 'config.yml']) as prefix:
+            definitions_file = prefix / 'definitions.yml'
+            definitions_file.write_text("launchers:\n  - framework: dlsdk\n")
+            (prefix / 'config.yml').write_text("models: []\n")
+            arguments = Namespace(config=prefix / 'config.yml', definitions=definitions_file)
+            assert ConfigReader._read_configs(arguments)[0] == {'launchers': [{'framework': 'dlsdk'}]}
+
+            definitions_file.write_text("launchers:\n  - framework: openvino\n")
+            modification_time = definitions_file.stat().st_mtime + 10
+            os.utime(str(definitions_file), (modification_time, modification_time))
+
+            assert ConfigReader._read_configs(arguments)[0] == {'launchers': [{'framework': 'openvino'}]}
+
+    def test_merge_device_configs_does_not_modify_cached_and_embedded_configs(self):
+        with mock_filesystem(['device_config.yml']) as prefix:
+            device_config_file = prefix / 'device_config.yml'
+            device_config_file.write_text("CPU:\n  CPU_THREADS_NUM: '4'\n")
+            embedded_device_config = {'CPU': {'CPU_BIND_THREAD': 'YES'}, 'GPU': {'GPU_THROUGHPUT_STREAMS': '2'}}
+            launcher = {'framework': 'dlsdk', 'device_config': embedded_device_config}
+            launcher_copy = dict(launcher)
+
+            merge_device_configs(launcher, device_config_file)
+            merge_device_configs(launcher_copy, device_config_file)
+            launcher['device_config']['CPU']['CPU_THREADS_NUM'] = '8'
+
+            assert launcher_copy['device_config'] == {
+                'CPU': {'CPU_BIND_THREAD': 'YES', 'CPU_THREADS_NUM': '4'}, 'GPU': {'GPU_THROUGHPUT_STREAMS': '2'}
+            }
+            assert embedded_device_config == {
+                'CPU': {'CPU_BIND_THREAD': 'YES'}, 'GPU': {'GPU_THROUGHPUT_STREAMS': '2'}
+            }
+            new_launcher = merge_device_configs({'framework': 'dlsdk'}, device_config_file)
+            assert new_launcher['device_config'] == {'CPU': {'CPU_THREADS_NUM': '4'}}
+
+    def test_modified_device_config_file_is_read_again(self):
+        with mock_filesystem(['device_config.yml']) as prefix:
+            device_config_file = prefix / 'device_config.yml'
+            device_config_file.write_text("CPU:\n  CPU_THREADS_NUM: '4'\n")
+            launcher = merge_device_configs({'framework': 'dlsdk'}, device_config_file)
+            assert launcher['device_config'] == {'CPU': {'CPU_THREADS_NUM': '4'}}
+
+            device_config_file.write_text("CPU:\n  CPU_THREADS_NUM: '8'\n")
+            modification_time = device_config_file.stat().st_mtime + 10
+            os.utime(str(device_config_file), (modification_time, modification_time))
+            launcher = merge_device_configs({'framework': 'dlsdk'}, device_config_file)
+
+            assert launcher['device_config'] == {'CPU': {'CPU_THREADS_NUM': '8'}}
+
+    def test_launchers_are_not_changed_without_filters(self):
+        launchers = [{'framework': 'dlsdk', 'tags': ['tag']}, {'framework': 'caffe', 'device': 'GPU'}]
+        expected_launchers = copy.deepcopy(launchers)
+        config = {'models': [
+            {'name': 'model', 'launchers': launchers, 'datasets': [{'name': 'dataset'}]},
+            {'name': 'model_without_launchers', 'launchers': [], 'datasets': [{'name': 'dataset'}]}
+        ]}
+        args = {'target_tags': None, 'target_backends': None, 'target_framework': None}
+
+        with pytest.warns(UserWarning):
+            filter_models(config, [], args)
+
+        assert len(config['models']) == 1
+        assert config['models'][0]['launchers'] is launchers
+        assert launchers == expected_launchers
+
+    def test_launchers_are_filtered_by_tags_backends_and_devices_together(self):
+        config = {'models': [{
+            'name': 'model',
+            'launchers': [
+                {'framework': 'dlsdk', 'tags': ['tag'], 'backend': 'backend', 'device': 'CPU'},
+                {'framework': 'dlsdk', 'tags': ['tag'], 'backend': 'backend', 'device': 'GPU'},
+                {'framework': 'dlsdk', 'tags': ['other_tag'], 'backend': 'backend', 'device': 'CPU'},
+                {'framework': 'dlsdk', 'tags': ['tag'], 'backend': 'other_backend', 'device': 'CPU'},
+                {'framework': 'dlsdk', 'tags': ['tag', 'other_tag'], 'backend': 'backend'}
+            ],
+            'datasets': [{'name': 'dataset'}]
+        }]}
+        args = {'target_tags': ['tag'], 'target_backends': ['backend'], 'target_framework': None}
+
+        filter_models(config, ['cpu'], args)
+
+        assert config['models'][0]['launchers'] == [
+            {'framework': 'dlsdk', 'tags': ['tag'], 'backend': 'backend', 'device': 'CPU'},
+            {'framework': 'dlsdk', 'tags': ['tag', 'other_tag'], 'backend': 'backend', 'device': 'cpu'}
+        ]
+
+    def test_dlsdk_launchers_are_switched_to_openvino_with_new_api(self):
+        launchers = [{'framework': 'dlsdk', 'device': 'CPU'}, {'framework': 'caffe'}, {'framework': 'dlsdk'}]
+
+        result = complete_openvino_launchers(launchers, True)
+
+        assert [launcher['framework'] for launcher in result] == ['openvino', 'caffe', 'openvino']
+
+    def test_openvino_launchers_are_switched_to_dlsdk_without_new_api(self):
+        launchers = [{'framework': 'openvino', 'device': 'CPU'}, {'framework': 'caffe'}]
+
+        result = complete_openvino_launchers(launchers, False)
+
+        assert [launcher['framework'] for launcher in result] == ['dlsdk', 'caffe']
+
+    def test_launchers_are_not_switched_if_target_framework_is_present(self):
+        launchers = [{'framework': 'dlsdk'}, {'framework': 'openvino'}]
+
+        assert [launcher['framework'] for launcher in complete_openvino_launchers(launchers, True)] == [
+            'dlsdk', 'openvino'
+        ]
+        assert [launcher['framework'] for launcher in complete_openvino_launchers(launchers, False)] == [
+            'dlsdk', 'openvino'
+        ]
+
+    def test_launchers_are_not_switched_if_new_api_usage_is_not_set(self):
+        launchers = [{'framework': 'dlsdk'}, {'framework': 'openvino', 'device': 'CPU'}]
+        config = {'models': [{'name': 'model', 'launchers': launchers, 'datasets': [{'name': 'dataset'}]}]}
+
+        filter_models(config, ['cpu'], {'target_framework': None})
+
+        assert complete_openvino_launchers(launchers, None) == [
+            {'framework': 'dlsdk'}, {'framework': 'openvino', 'device': 'CPU'}
+        ]
+        assert config['models'][0]['launchers'] == [
+            {'framework': 'dlsdk', 'device': 'cpu'}, {'framework': 'openvino', 'device': 'CPU'}
+        ]
+
+    def test_dlsdk_target_framework_selects_completed_openvino_launchers_with_new_api(self):
+        config = {'models': [{
+            'name': 'model',
+            'launchers': [{'framework': 'dlsdk', 'device': 'CPU'}, {'framework': 'caffe', 'device': 'CPU'}],
+            'datasets': [{'name': 'dataset'}]
+        }]}
+
+        filter_models(config, [], {'target_framework': 'dlsdk', 'use_new_api': True})
+
+        assert config['models'][0]['launchers'] == [{'framework': 'openvino', 'device': 'CPU'}]
+
     def get_global_launcher(self, framework):
         for launcher in self.global_launchers:
             if launcher['framework'] == framework: